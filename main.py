@@ -1,6 +1,13 @@
 import os
+import json
+import time
+import base64
+import asyncio
+import hashlib
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from logging.handlers import RotatingFileHandler
+from http.cookies import SimpleCookie
 from dotenv import load_dotenv
 
 from fastapi import FastAPI, Depends, HTTPException, Request, Form, Cookie
@@ -9,14 +16,16 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
 from typing import Optional, Literal
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, ForeignKey, DateTime
-from sqlalchemy.orm import sessionmaker, declarative_base, Session, relationship
+from sqlalchemy import event, make_url, Column, Integer, String, Boolean, ForeignKey, DateTime, Index, func, case, select, delete, lambda_stmt, bindparam
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import declarative_base, relationship, raiseload
 
+from cachetools import TTLCache
 from passlib.context import CryptContext
-from jose import jwt, JWTError
-from starlette.middleware.sessions import SessionMiddleware
+from jose import jwk, jwt, JWTError
+from starlette.datastructures import MutableHeaders
 
 
 # Load environment variables from .env file
@@ -29,6 +38,7 @@ SECRET_KEY = os.environ.get("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 DATABASE_URL = os.environ.get("DATABASE_URL")
+DEBUG = os.environ.get("DEBUG", "").lower() in ("1", "true", "yes")
 
 if SECRET_KEY is None:
     raise ValueError("SECRET_KEY is not set in the environment. Please create a .env file.")
@@ -60,8 +70,29 @@ def setup_logging():
 # ----------------------------
 # Database Setup
 # ----------------------------
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+# Plain URLs from .env are mapped onto their async drivers; URLs that already name a driver are kept
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+_database_url = make_url(DATABASE_URL)
+ASYNC_DATABASE_URL = _database_url.set(drivername=ASYNC_DRIVERS.get(_database_url.drivername, _database_url.drivername))
+
+if _database_url.get_backend_name() == "sqlite":
+    engine = create_async_engine(ASYNC_DATABASE_URL, connect_args={"check_same_thread": False, "timeout": 30})
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers proceed while a write is in flight; the rest keep hot pages in memory
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA cache_size=-64000")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+else:
+    engine = create_async_engine(ASYNC_DATABASE_URL, pool_size=20, max_overflow=40, pool_pre_ping=True)
+
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 class User(Base):
@@ -69,87 +100,228 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True)
     hashed_password = Column(String)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    # The client-side default renders CURRENT_TIMESTAMP into the INSERT, so tables created
+    # before the server default existed still get a timestamp from the database
+    created_at = Column(DateTime, default=func.now(), server_default=func.now(), nullable=False)
     todos = relationship("Todo", back_populates="owner", cascade="all, delete-orphan")
 
 class Todo(Base):
     __tablename__ = "todos"
+    # Covers the per-user status filter and the newest-first ordering on the index page
+    __table_args__ = (Index("ix_todos_user_completed_created", "user_id", "completed", "created_at"),)
     id = Column(Integer, primary_key=True, index=True)
-    title = Column(String, index=True)
+    title = Column(String)
     description = Column(String)
     completed = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=func.now(), server_default=func.now(), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("User", back_populates="todos")
 
-Base.metadata.create_all(bind=engine)
+# In debug mode any lazy relationship load on the authenticated user raises instead of silently querying
+_user_load_options = [raiseload("*")] if DEBUG else []
+
+# Hot-path lookups built once as lambda statements so repeat executions skip statement construction
+_user_by_username = lambda_stmt(
+    lambda: select(User).options(*_user_load_options).where(User.username == bindparam("username"))
+)
+_todo_by_id = lambda_stmt(
+    lambda: select(Todo).where(Todo.id == bindparam("id"), Todo.user_id == bindparam("uid"))
+)
+
+async def get_db():
+    async with SessionLocal() as db:
+        yield db
 
 # ----------------------------
 # Password & JWT Helpers
 # ----------------------------
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=12)
-
-def get_password_hash(password):
+# New hashes use argon2id; existing bcrypt hashes are upgraded on the next successful login
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"], deprecated="auto",
+    argon2__memory_cost=47104, argon2__time_cost=1, argon2__parallelism=1,
+    bcrypt__rounds=10
+)
+
+# Verified against when a login names an unknown user
+_DUMMY_HASH = pwd_context.hash("x")
+
+# Accounts from before the argon2 switch still hold bcrypt-12 hashes, which take several times longer
+# to verify than argon2. While any remain, startup sets this so failed logins can be padded to match.
+_LEGACY_BCRYPT_ROUNDS = 12
+_legacy_bcrypt_dummy_hash: Optional[str] = None
+
+# Hashing is CPU-bound, so it runs in its own CPU-sized pool to keep the event loop free and to stop a
+# burst of logins from starving the default executor. argon2 and bcrypt release the GIL, so threads suffice.
+_PASSWORD_HASH_POOL = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="pwhash")
+
+async def get_password_hash(password):
     password_bytes = password.encode('utf-8')[:72]
-    return pwd_context.hash(password_bytes)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_PASSWORD_HASH_POOL, pwd_context.hash, password_bytes)
 
-def verify_password(plain_password, hashed_password):
+async def verify_password(plain_password, hashed_password):
+    """Returns (verified, new_hash); new_hash is set when the stored hash should be upgraded."""
     password_bytes = plain_password.encode('utf-8')[:72]
-    return pwd_context.verify(password_bytes, hashed_password)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_PASSWORD_HASH_POOL, pwd_context.verify_and_update, password_bytes, hashed_password)
+
+async def pad_failed_login(plain_password, hashed_password):
+    """Verifies against the dummy of the other scheme, so every failed login costs argon2 plus bcrypt-12
+    while legacy hashes exist, whether the username was unknown, argon2 or bcrypt.
+    The legacy check runs only at startup, so padding stays on until restart once enabled."""
+    if _legacy_bcrypt_dummy_hash is None: return
+    pad_hash = _DUMMY_HASH if pwd_context.identify(hashed_password) == "bcrypt" else _legacy_bcrypt_dummy_hash
+    await verify_password(plain_password, pad_hash)
+
+# Built once so encode/decode skip re-parsing SECRET_KEY into an HMAC key on every call
+_SIGNING_KEY = jwk.construct(SECRET_KEY, ALGORITHM)
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return jwt.encode(to_encode, _SIGNING_KEY, algorithm=ALGORITHM)
+
+# Maps a token digest to (user_id, username, exp) so hot tokens skip JWT decoding and the username lookup.
+# The digest covers the whole token, so a forged token can never hit an entry cached for a verified one.
+_token_cache = TTLCache(maxsize=10_000, ttl=60)
+
+def _token_cache_key(token: str):
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+def invalidate_cached_tokens(username: str):
+    for key, (_, cached_username, _) in list(_token_cache.items()):
+        if cached_username == username:
+            _token_cache.pop(key, None)
 
-def _get_user_from_token(db: Session, token: Optional[str]):
+async def _get_user_from_token(db: AsyncSession, token: Optional[str]):
     if not token:
         return None
+    key = _token_cache_key(token)
+    cached = _token_cache.get(key)
+    if cached is not None:
+        user_id, _, exp = cached
+        if exp > time.time():
+            return await db.get(User, user_id, options=_user_load_options)
+        _token_cache.pop(key, None)
+        return None
+    # Signature and expiry are only verified on a cache miss
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, _SIGNING_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None: return None
-        return db.query(User).filter(User.username == username).first()
     except JWTError:
         return None
+    user = (await db.execute(_user_by_username, {"username": username})).scalar_one_or_none()
+    if user is not None:
+        _token_cache[key] = (user.id, user.username, payload["exp"])
+    return user
 
-def get_current_user_optional(request: Request, db: Session = Depends(lambda: next(get_db()))):
+async def get_current_user_optional(request: Request, db: AsyncSession = Depends(get_db)):
     token = request.cookies.get("access_token")
-    return _get_user_from_token(db, token)
+    return await _get_user_from_token(db, token)
 
-def get_current_user(request: Request, db: Session = Depends(lambda: next(get_db()))):
-    user = get_current_user_optional(request, db)
+async def get_current_user(user: Optional[User] = Depends(get_current_user_optional)):
     if user is None:
         return RedirectResponse("/login", status_code=303)
     return user
 
+# ----------------------------
+# Flash Messages
+# ----------------------------
+# Pending messages travel in a short-lived cookie that is only written when they change,
+# so requests without messages carry no signing work and no Set-Cookie header.
+FLASH_COOKIE = "flash"
+FLASH_COOKIE_MAX_AGE = 60
+
+def _decode_flash_cookie(value: str):
+    try:
+        messages = json.loads(base64.urlsafe_b64decode(value))
+    except ValueError:
+        return []
+    return messages if isinstance(messages, list) else []
+
+def _flash_cookie_header(messages: list):
+    cookie = SimpleCookie()
+    cookie[FLASH_COOKIE] = base64.urlsafe_b64encode(json.dumps(messages).encode()).decode() if messages else ""
+    morsel = cookie[FLASH_COOKIE]
+    morsel["max-age"] = FLASH_COOKIE_MAX_AGE if messages else 0
+    morsel["path"] = "/"
+    morsel["httponly"] = True
+    morsel["samesite"] = "lax"
+    return morsel.OutputString()
+
+def _pending_flashes(request: Request):
+    state = request.state
+    if not hasattr(state, "flash_messages"):
+        cookie = request.cookies.get(FLASH_COOKIE)
+        state.flash_messages = _decode_flash_cookie(cookie) if cookie else []
+        state.flash_had_cookie = cookie is not None
+        # A cookie that decodes to nothing is cleared rather than resent on every request
+        state.flash_dirty = state.flash_had_cookie and not state.flash_messages
+    return state.flash_messages
+
+def flash(request: Request, message: str, category: str = "info"):
+    _pending_flashes(request).append({"message": message, "category": category})
+    request.state.flash_dirty = True
+
+def get_flashed_messages(request: Request):
+    messages = _pending_flashes(request)
+    if not messages: return []
+    request.state.flash_messages = []
+    request.state.flash_dirty = True
+    return messages
+
+class FlashCookieMiddleware:
+    """Writes or clears the flash cookie on responses whose request changed the pending messages."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_flash_cookie(message):
+            if message["type"] == "http.response.start":
+                state = scope.get("state", {})
+                messages = state.get("flash_messages")
+                if state.get("flash_dirty") and (messages or state.get("flash_had_cookie")):
+                    MutableHeaders(scope=message).append("set-cookie", _flash_cookie_header(messages))
+            await send(message)
+
+        await self.app(scope, receive, send_with_flash_cookie)
+
 # ----------------------------
 # App Setup
 # ----------------------------
 app = FastAPI(title="To-Do App", description="A simple task management application", version="1.0.0")
-app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
+app.add_middleware(FlashCookieMiddleware)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
 @app.on_event("startup")
 async def startup_event():
+    global _legacy_bcrypt_dummy_hash
     setup_logging()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        # create_all skips indexes on tables that already exist, so add any that are missing
+        for index in Todo.__table__.indexes:
+            await conn.run_sync(index.create, checkfirst=True)
+        # bcrypt hashes start with $2a$, $2b$ or $2y$
+        has_legacy_hashes = (await conn.execute(
+            select(User.id).where(User.hashed_password.like("$2%")).limit(1)
+        )).first() is not None
+    if has_legacy_hashes:
+        legacy_bcrypt = pwd_context.handler("bcrypt").using(rounds=_LEGACY_BCRYPT_ROUNDS)
+        _legacy_bcrypt_dummy_hash = legacy_bcrypt.hash("x")
     logger.info("Application startup complete.")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-        
-def flash(request: Request, message: str, category: str = "info"):
-    if "_messages" not in request.session: request.session["_messages"] = []
-    request.session["_messages"].append({"message": message, "category": category})
-
-def get_flashed_messages(request: Request):
-    return request.session.pop("_messages") if "_messages" in request.session else []
+@app.on_event("shutdown")
+async def shutdown_event():
+    await engine.dispose()
 
 templates.env.globals['get_flashed_messages'] = get_flashed_messages
 
@@ -157,50 +329,59 @@ templates.env.globals['get_flashed_messages'] = get_flashed_messages
 # Routes
 # ----------------------------
 @app.get("/", response_class=HTMLResponse)
-def index(
+async def index(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
     filter: Literal["all", "pending", "completed"] = "all"
 ):
     if isinstance(user, RedirectResponse): return user
     
-    all_todos_query = db.query(Todo).filter(Todo.user_id == user.id)
-    if filter == "pending": todos_query = all_todos_query.filter(Todo.completed == False)
-    elif filter == "completed": todos_query = all_todos_query.filter(Todo.completed == True)
-    else: todos_query = all_todos_query
-
-    todos = todos_query.order_by(Todo.created_at.desc()).all()
-    all_todos = all_todos_query.all()
-
-    completed_count = sum(1 for todo in all_todos if todo.completed)
-    pending_count = len(all_todos) - completed_count
+    todos_query = select(Todo).where(Todo.user_id == user.id)
+    if filter == "pending": todos_query = todos_query.where(Todo.completed == False)
+    elif filter == "completed": todos_query = todos_query.where(Todo.completed == True)
+
+    # created_at has one-second resolution on SQLite, so id breaks ties between todos added together
+    todos = (await db.execute(todos_query.order_by(Todo.created_at.desc(), Todo.id.desc()))).scalars().all()
+
+    if filter == "all":
+        # The unfiltered listing already holds every todo, so count it instead of querying again
+        total_count = len(todos)
+        completed_count = sum(todo.completed for todo in todos)
+    else:
+        # Totals come from a single aggregate query instead of hydrating every todo
+        total_count, completed_count = (await db.execute(select(
+            func.count(Todo.id),
+            func.sum(case((Todo.completed == True, 1), else_=0))
+        ).where(Todo.user_id == user.id))).one()
+        completed_count = completed_count or 0
+    pending_count = total_count - completed_count
     
     return templates.TemplateResponse("index.html", {
         "request": request, "todos": todos, "user": user,
         "completed_count": completed_count, "pending_count": pending_count,
-        "total_count": len(all_todos), "current_filter": filter
+        "total_count": total_count, "current_filter": filter
     })
 
 @app.get("/register", response_class=HTMLResponse)
-def register_page(request: Request):
+async def register_page(request: Request):
     return templates.TemplateResponse("register.html", {"request": request})
 
 @app.post("/register")
-def register(request: Request, username: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
+async def register(request: Request, username: str = Form(...), password: str = Form(...), db: AsyncSession = Depends(get_db)):
     if len(username) < 3:
         flash(request, "Username must be at least 3 characters long", "error")
         return templates.TemplateResponse("register.html", {"request": request}, status_code=400)
     if len(password) < 6:
         flash(request, "Password must be at least 6 characters long", "error")
         return templates.TemplateResponse("register.html", {"request": request}, status_code=400)
-    if db.query(User).filter(User.username == username).first():
+    if (await db.execute(select(User.id).where(User.username == username))).first():
         flash(request, "Username already exists", "error")
         return templates.TemplateResponse("register.html", {"request": request}, status_code=400)
     
-    user = User(username=username, hashed_password=get_password_hash(password))
+    user = User(username=username, hashed_password=await get_password_hash(password))
     db.add(user)
-    db.commit()
+    await db.commit()
     
     logger.info(f"New user registered: '{username}'")
     
@@ -208,16 +389,22 @@ def register(request: Request, username: str = Form(...), password: str = Form(.
     return RedirectResponse("/login", status_code=303)
 
 @app.get("/login", response_class=HTMLResponse)
-def login_page(request: Request):
+async def login_page(request: Request):
     return templates.TemplateResponse("login.html", {"request": request})
 
 @app.post("/login")
-def login(request: Request, username: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == username).first()
-    if not user or not verify_password(password, user.hashed_password):
+async def login(request: Request, username: str = Form(...), password: str = Form(...), db: AsyncSession = Depends(get_db)):
+    user = (await db.execute(_user_by_username, {"username": username})).scalar_one_or_none()
+    hashed = user.hashed_password if user else _DUMMY_HASH
+    verified, new_hash = await verify_password(password, hashed)
+    if not user or not verified:
+        await pad_failed_login(password, hashed)
         logger.warning(f"Failed login attempt for username: '{username}'")
         flash(request, "Invalid username or password", "error")
         return templates.TemplateResponse("login.html", {"request": request}, status_code=401)
+    if new_hash is not None:
+        user.hashed_password = new_hash
+        await db.commit()
     
     access_token = create_access_token({"sub": user.username})
     response = RedirectResponse("/", status_code=303)
@@ -228,15 +415,16 @@ def login(request: Request, username: str = Form(...), password: str = Form(...)
     return response
 
 @app.get("/change-password", response_class=HTMLResponse)
-def change_password_page(request: Request, user: User = Depends(get_current_user)):
+async def change_password_page(request: Request, user: User = Depends(get_current_user)):
     if isinstance(user, RedirectResponse):
         return user
     return templates.TemplateResponse("change_password.html", {"request": request, "user": user})
 
 @app.post("/change-password")
-def change_password(request: Request, old_password: str = Form(...), new_password: str = Form(...), confirm_password: str = Form(...), db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+async def change_password(request: Request, old_password: str = Form(...), new_password: str = Form(...), confirm_password: str = Form(...), db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
     if isinstance(user, RedirectResponse): return user
-    if not verify_password(old_password, user.hashed_password):
+    verified, _ = await verify_password(old_password, user.hashed_password)
+    if not verified:
         flash(request, "Current password is incorrect", "error")
         return templates.TemplateResponse("change_password.html", {"request": request, "user": user}, status_code=400)
     if len(new_password) < 6:
@@ -246,9 +434,10 @@ def change_password(request: Request, old_password: str = Form(...), new_passwor
         flash(request, "New passwords do not match", "error")
         return templates.TemplateResponse("change_password.html", {"request": request, "user": user}, status_code=400)
     
-    db_user = db.query(User).filter(User.id == user.id).first()
-    db_user.hashed_password = get_password_hash(new_password)
-    db.commit()
+    db_user = await db.get(User, user.id)
+    db_user.hashed_password = await get_password_hash(new_password)
+    await db.commit()
+    invalidate_cached_tokens(user.username)
     
     logger.info(f"User '{user.username}' changed their password successfully.")
     
@@ -256,7 +445,7 @@ def change_password(request: Request, old_password: str = Form(...), new_passwor
     return templates.TemplateResponse("change_password.html", {"request": request, "user": user})
 
 @app.post("/add_todo")
-def add_todo(request: Request, title: str = Form(...), description: str = Form(""), db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+async def add_todo(request: Request, title: str = Form(...), description: str = Form(""), db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
     if isinstance(user, RedirectResponse): return user
     if not title.strip():
         flash(request, "Title cannot be empty", "error")
@@ -264,7 +453,7 @@ def add_todo(request: Request, title: str = Form(...), description: str = Form("
     
     todo = Todo(title=title.strip(), description=description.strip(), user_id=user.id)
     db.add(todo)
-    db.commit()
+    await db.commit()
     
     logger.info(f"User '{user.username}' added a new task: '{title.strip()}' (ID: {todo.id})")
     
@@ -272,13 +461,13 @@ def add_todo(request: Request, title: str = Form(...), description: str = Form("
     return RedirectResponse("/?filter=pending", status_code=303)
 
 @app.post("/toggle_todo/{todo_id}")
-def toggle_todo(request: Request, todo_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+async def toggle_todo(request: Request, todo_id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
     if isinstance(user, RedirectResponse): return user
-    todo = db.query(Todo).filter(Todo.id == todo_id, Todo.user_id == user.id).first()
+    todo = (await db.execute(_todo_by_id, {"id": todo_id, "uid": user.id})).scalar_one_or_none()
     if not todo: raise HTTPException(status_code=404, detail="Todo not found")
     
     todo.completed = not todo.completed
-    db.commit()
+    await db.commit()
 
     status = "completed" if todo.completed else "pending"
     logger.info(f"User '{user.username}' changed status of task ID {todo_id} to '{status}'")
@@ -287,13 +476,13 @@ def toggle_todo(request: Request, todo_id: int, db: Session = Depends(get_db), u
     return RedirectResponse(referer, status_code=303)
 
 @app.post("/delete_todo/{todo_id}")
-def delete_todo(request: Request, todo_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+async def delete_todo(request: Request, todo_id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
     if isinstance(user, RedirectResponse): return user
-    todo = db.query(Todo).filter(Todo.id == todo_id, Todo.user_id == user.id).first()
+    todo = (await db.execute(_todo_by_id, {"id": todo_id, "uid": user.id})).scalar_one_or_none()
     if not todo: raise HTTPException(status_code=404, detail="Todo not found")
     
-    db.delete(todo)
-    db.commit()
+    await db.delete(todo)
+    await db.commit()
 
     logger.info(f"User '{user.username}' deleted task ID {todo_id}")
     
@@ -302,17 +491,24 @@ def delete_todo(request: Request, todo_id: int, db: Session = Depends(get_db), u
     return RedirectResponse(referer, status_code=303)
 
 @app.post("/delete_all_completed")
-def delete_all_completed(request: Request, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+async def delete_all_completed(request: Request, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
     if isinstance(user, RedirectResponse):
         return user
-    db.query(Todo).filter(Todo.user_id == user.id, Todo.completed == True).delete()
-    db.commit()
+    # No todos are loaded in this session, so skip synchronizing it with the bulk delete
+    await db.execute(
+        delete(Todo).where(Todo.user_id == user.id, Todo.completed == True)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
     logger.info(f"User '{user.username}' deleted all their completed tasks.")
     flash(request, "All completed tasks have been cleared.", "success")
     return RedirectResponse("/", status_code=303)
 
 @app.get("/logout")
-def logout():
+async def logout(request: Request):
+    token = request.cookies.get("access_token")
+    if token:
+        _token_cache.pop(_token_cache_key(token), None)
     response = RedirectResponse(url="/login", status_code=303)
     response.delete_cookie(key="access_token")
     logger.info("User logged out.")